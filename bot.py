@@ -1,26 +1,34 @@
 import asyncio
+import html
 import logging
 import os
 import re
+import sys
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from operator import attrgetter
+from typing import List, Optional, Tuple
 
 from telegram import (
     Update,
     Message,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
-    Chat,
 )
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
+    PicklePersistence,
     filters,
 )
+from telegram.request import HTTPXRequest
 
 # =========================
 # Logging
@@ -70,8 +78,11 @@ COPY = {
         "No active session found.\n"
         "Start a new one with /first."
     ),
-    "file_received": "Got it: *{name}*",
-    "file_received_noname": "Got it (no name, assigned): *{name}*",
+    "capture_status": (
+        "Captured <b>{count}</b> file(s) so far.\n"
+        "Latest: <b>{name}</b>\n\n"
+        "Keep sending, or finish with /last."
+    ),
     "last_processing": (
         "Wrapping up your session…\n"
         "• Total files captured: *{count}*\n"
@@ -83,6 +94,12 @@ COPY = {
         "I forwarded *{count}* files in sorted order.\n\n"
         "Start another round with /first whenever you like."
     ),
+    "last_partial": (
+        "Finished with errors. ⚠️\n"
+        "I forwarded *{sent}* of *{count}* files in sorted order; "
+        "*{failed}* could not be copied.\n\n"
+        "Start another round with /first whenever you like."
+    ),
     "last_none": (
         "I didn’t receive any files in this session.\n"
         "Start again with /first and upload your files."
@@ -103,7 +120,7 @@ raw_ids = os.getenv("ALLOWED_USER_IDS", "1423807625,6520490787,2096201372").stri
 # If you prefer hard-coding, uncomment and edit:
 # raw_ids = "111111111,222222222"
 
-def _parse_ids(raw: str):
+def _parse_ids(raw: str) -> set:
     ids = set()
     for part in raw.split(","):
         part = part.strip()
@@ -114,7 +131,10 @@ def _parse_ids(raw: str):
                 pass
     return ids
 
-ALLOWED_USER_IDS = _parse_ids(raw_ids)
+ALLOWED_USER_IDS: frozenset = frozenset(_parse_ids(raw_ids))
+# If ALLOWED_USER_IDS is empty, allow everyone (dev-friendly).
+# To deny everyone unless listed, set this to False.
+_AUTH_OPEN = not ALLOWED_USER_IDS
 
 # Contact handle used in the denial message button
 CONTACT_HANDLE = "THe_vK_3"
@@ -125,30 +145,41 @@ COPY["denied"] = (
     f"✉️ Contact @{CONTACT_HANDLE} for access!"
 )
 
+# =========================
+# Static UI (built once at import)
+# =========================
+START_TEXT = (
+    f"{COPY['emoji_logo']} *{COPY['start_title']}*\n\n"
+    f"{COPY['start_body']}\n\n"
+    f"— _{COPY['brand']}_"
+)
+HELP_TEXT = COPY["help"] + f"\n\n_{COPY['footer_cta']}_"
+
+START_KB = InlineKeyboardMarkup.from_row([
+    InlineKeyboardButton("Start Sorting", callback_data="cta_first"),
+    InlineKeyboardButton("How to Use", callback_data="cta_help"),
+])
+DENIED_KB = InlineKeyboardMarkup.from_row([
+    InlineKeyboardButton(
+        text=f"Contact @{CONTACT_HANDLE}",
+        url=f"https://t.me/{CONTACT_HANDLE}"
+    )
+])
+
 def is_authorized(update: Update) -> bool:
     user = update.effective_user
-    if not user:
-        return False
-    # If ALLOWED_USER_IDS is empty, allow everyone (dev-friendly).
-    # To deny everyone unless listed, replace with: return user.id in ALLOWED_USER_IDS
-    return (not ALLOWED_USER_IDS) or (user.id in ALLOWED_USER_IDS)
+    return user is not None and (_AUTH_OPEN or user.id in ALLOWED_USER_IDS)
 
 def require_auth(handler_fn):
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_authorized(update):
             try:
-                kb = InlineKeyboardMarkup.from_row([
-                    InlineKeyboardButton(
-                        text=f"Contact @{CONTACT_HANDLE}",
-                        url=f"https://t.me/{CONTACT_HANDLE}"
-                    )
-                ])
-                target = (
-                    (update.effective_message or (update.callback_query and update.callback_query.message))
+                target = update.effective_message or (
+                    update.callback_query and update.callback_query.message
                 )
                 if target:
                     await target.reply_text(
-                        COPY["denied"], parse_mode=ParseMode.MARKDOWN, reply_markup=kb
+                        COPY["denied"], parse_mode=ParseMode.MARKDOWN, reply_markup=DENIED_KB
                     )
             except Exception:
                 pass
@@ -160,11 +191,16 @@ def require_auth(handler_fn):
 # Session storage
 # =========================
 class Item:
-    def __init__(self, message_id: int, file_name: str, date_iso: str, msg_type: str):
+    # Many of these are held per session; skip the per-instance __dict__.
+    __slots__ = ("message_id", "file_name", "msg_type", "sort_key")
+
+    def __init__(self, message_id: int, file_name: str, msg_type: str):
         self.message_id = message_id
         self.file_name = file_name
-        self.date_iso = date_iso
         self.msg_type = msg_type
+        # Computed once at capture so /last only compares tuples; equal
+        # names fall back to message_id, which is monotonic per chat.
+        self.sort_key: tuple = (natural_sort_key(file_name), message_id)
 
     def __repr__(self):
         return f"Item({self.file_name!r}, message_id={self.message_id}, type={self.msg_type})"
@@ -175,87 +211,177 @@ class Session:
         self.user_id = user_id
         self.items: List[Item] = []
         self.collecting: bool = False
+        self.last_touch: float = time.time()
+        # Batched capture ack: one status message, edited in place
+        self.ack_msg_id: Optional[int] = None
+        self.ack_pending: int = 0
+        self.ack_last_flush: float = 0.0
+        self.ack_interval: float = ACK_INTERVAL
+        self.ack_ok_streak: int = 0
+        self.ack_in_flight: bool = False
+
+    def __getstate__(self):
+        # A send in flight does not survive a restart
+        state = self.__dict__.copy()
+        state["ack_in_flight"] = False
+        return state
+
+# Sessions live in context.chat_data keyed by user id, so each
+# (chat, user) pair gets its own session and PTB persistence covers it.
+
+# Abandoned sessions are evicted (tune via env):
+#   MAX_SESSIONS="1000"   open sessions kept bot-wide; least recently used go first
+#   SESSION_TTL="21600"   seconds without activity before a session is dropped
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "21600"))
+SWEEP_INTERVAL = 30 * 60
+if MAX_SESSIONS < 1:
+    raise RuntimeError("MAX_SESSIONS must be at least 1")
+
+# Capture acks are coalesced: wait ACK_DEBOUNCE after a file arrives and
+# never update the status message more than once per interval. The
+# interval starts at ACK_INTERVAL, doubles on RetryAfter (up to
+# ACK_INTERVAL_MAX) and halves again after ACK_RECOVER_AFTER clean flushes.
+ACK_DEBOUNCE = 0.8
+ACK_INTERVAL = 1.0
+ACK_INTERVAL_MAX = 10.0
+ACK_RECOVER_AFTER = 3
+
+def _ack_job_name(chat_id: int, user_id: int) -> str:
+    return f"ack:{chat_id}:{user_id}"
+
+# A session that ends must not post another status update, and a fresh
+# /first must be free to schedule its own flush under the same job name.
+def _stop_acks(job_queue, sess: Session):
+    sess.collecting = False
+    for job in job_queue.get_jobs_by_name(_ack_job_name(sess.chat_id, sess.user_id)):
+        job.schedule_removal()
+
+# Recency index over open sessions, least recently touched first:
+# (chat_id, user_id) -> last touch. Eviction pops from the front.
+_SESSION_LRU: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+
+def _touch_session(sess: Session):
+    key = (sess.chat_id, sess.user_id)
+    sess.last_touch = time.time()
+    _SESSION_LRU[key] = sess.last_touch
+    _SESSION_LRU.move_to_end(key)
+
+def _iter_sessions(application: Application):
+    for chat_id, data in application.chat_data.items():
+        for user_id, sess in data.items():
+            if isinstance(sess, Session):
+                yield chat_id, user_id, sess
+
+# Every session removal goes through here, so empty chats are dropped and
+# persistence learns about the change even when called outside that chat.
+def _drop_session(application: Application, chat_id: int, user_id: int) -> Optional[Session]:
+    _SESSION_LRU.pop((chat_id, user_id), None)
+    data = application.chat_data.get(chat_id)
+    if data is None:
+        return None
+    sess = data.pop(user_id, None)
+    if isinstance(sess, Session):
+        _stop_acks(application.job_queue, sess)
+    if data:
+        application.mark_data_for_update_persistence(chat_ids=chat_id)
+    else:
+        application.drop_chat_data(chat_id)
+    return sess
 
-# In-memory store keyed by (chat_id, user_id)
-SESSIONS: Dict[tuple, Session] = {}
+# Sessions restored by persistence are not in the index yet
+async def _load_session_index(application: Application):
+    restored = sorted(_iter_sessions(application), key=lambda s: s[2].last_touch)
+    for chat_id, user_id, sess in restored:
+        _SESSION_LRU[(chat_id, user_id)] = sess.last_touch
 
 # =========================
 # Utilities
 # =========================
-def session_key(chat: Chat, user_id: int) -> tuple:
-    return (chat.id, user_id)
+_WS_RE = re.compile(r"\s+")
+_NAT_RE = re.compile(r"(\d+)")
 
 def safe_filename(name: str) -> str:
-    name = re.sub(r"\s+", " ", name or "").strip()
+    name = _WS_RE.sub(" ", name or "").strip()
     if not name:
         name = "unnamed"
     return name
 
-def infer_name_from_message(msg: Message) -> str:
-    if msg.document and msg.document.file_name:
-        return safe_filename(msg.document.file_name)
-    if msg.video and msg.video.file_name:
-        return safe_filename(msg.video.file_name)
-    if msg.audio and msg.audio.file_name:
-        return safe_filename(msg.audio.file_name)
-    if msg.animation and msg.animation.file_name:
-        return safe_filename(msg.animation.file_name)
-
-    base = None
+# Checked in order; the first attribute present decides the media type
+_MEDIA_ATTRS = ("document", "photo", "video", "audio", "voice", "animation")
+
+# Detect the media type and infer a file name in one pass over msg
+def classify(msg: Message) -> Tuple[Optional[str], str]:
+    for media_type in _MEDIA_ATTRS:
+        media = getattr(msg, media_type)
+        if media:
+            break
+    else:
+        return None, ""
+
+    # photo is a tuple of sizes and voice has no name; both fall through
+    file_name = getattr(media, "file_name", None)
+    if file_name:
+        return media_type, safe_filename(file_name)
+
     if msg.caption:
         base = msg.caption
     else:
         ts = (msg.date or datetime.now(timezone.utc)).strftime("%Y%m%d_%H%M%S")
-        if msg.photo:
-            base = f"photo_{ts}"
-        elif msg.voice:
-            base = f"voice_{ts}"
-        else:
-            base = f"media_{ts}"
-
-    return safe_filename(base)
-
-def natural_sort_key(s: str):
-    return [
-        int(text) if text.isdigit() else text.lower()
-        for text in re.findall(r"\d+|\D+", s)
-    ]
-
-def is_supported_media(msg: Message) -> Optional[str]:
-    if msg.document:
-        return "document"
-    if msg.photo:
-        return "photo"
-    if msg.video:
-        return "video"
-    if msg.audio:
-        return "audio"
-    if msg.voice:
-        return "voice"
-    if msg.animation:
-        return "animation"
-    return None
+        prefix = media_type if media_type in ("photo", "voice") else "media"
+        base = f"{prefix}_{ts}"
+
+    return media_type, safe_filename(base)
+
+def natural_sort_key(s: str) -> tuple:
+    # Splitting on a captured digit run puts numbers at the odd indices.
+    # Empty parts are kept so every key alternates str/int from a str, which
+    # keeps keys comparable ("1a" vs "a1"); text tokens are interned because
+    # prefixes like "img_" repeat across a session.
+    parts = _NAT_RE.split(s.lower())
+    return tuple(int(p) if i & 1 else sys.intern(p) for i, p in enumerate(parts))
+
+# Telegram says how long to wait when it throttles us; honour that a few
+# times before giving up on the call.
+RETRY_AFTER_MAX_ATTEMPTS = 3
+
+async def _retry_after(call, *args, **kwargs):
+    for attempt in range(1, RETRY_AFTER_MAX_ATTEMPTS + 1):
+        try:
+            return await call(*args, **kwargs)
+        except RetryAfter as e:
+            if attempt == RETRY_AFTER_MAX_ATTEMPTS:
+                raise
+            log.warning("Rate limited, retrying in %ss", e.retry_after)
+            await asyncio.sleep(e.retry_after)
+
+# copyMessages takes at most 100 ids and only in strictly increasing order,
+# so the sorted ids are cut into the longest such runs.
+COPY_BATCH_MAX = 100
+
+def _increasing_runs(ids: List[int], limit: int):
+    run: List[int] = []
+    for message_id in ids:
+        if run and (message_id <= run[-1] or len(run) >= limit):
+            yield run
+            run = []
+        run.append(message_id)
+    if run:
+        yield run
 
 # =========================
 # Handlers
 # =========================
 @require_auth
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    kb = InlineKeyboardMarkup.from_row([
-        InlineKeyboardButton("Start Sorting", callback_data="cta_first"),
-        InlineKeyboardButton("How to Use", callback_data="cta_help"),
-    ])
-    text = (
-        f"{COPY['emoji_logo']} *{COPY['start_title']}*\n\n"
-        f"{COPY['start_body']}\n\n"
-        f"— _{COPY['brand']}_"
+    await update.effective_message.reply_text(
+        START_TEXT, parse_mode=ParseMode.MARKDOWN, reply_markup=START_KB
     )
-    await update.effective_message.reply_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=kb)
 
 @require_auth
 async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_message.reply_text(
-        COPY["help"] + f"\n\n_{COPY['footer_cta']}_",
+        HELP_TEXT,
         parse_mode=ParseMode.MARKDOWN
     )
 
@@ -270,109 +396,209 @@ async def callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @require_auth
 async def first_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.effective_message
     chat = update.effective_chat
     user = update.effective_user
-    key = session_key(chat, user.id)
-    sess = SESSIONS.get(key)
+    sess = context.chat_data.get(user.id)
 
     if sess and sess.collecting:
-        await update.effective_message.reply_text(COPY["already_capturing"])
+        await msg.reply_text(COPY["already_capturing"])
         return
 
-    SESSIONS[key] = Session(chat_id=chat.id, user_id=user.id)
-    SESSIONS[key].collecting = True
-    await update.effective_message.reply_text(
+    while len(_SESSION_LRU) >= MAX_SESSIONS:
+        old_chat, old_user = next(iter(_SESSION_LRU))
+        _drop_session(context.application, old_chat, old_user)
+        log.info("Evicted session (%s, %s): MAX_SESSIONS reached", old_chat, old_user)
+
+    sess = Session(chat_id=chat.id, user_id=user.id)
+    sess.collecting = True
+    context.chat_data[user.id] = sess
+    _touch_session(sess)
+    await msg.reply_text(
         COPY["first_started"],
         parse_mode=ParseMode.MARKDOWN
     )
 
 @require_auth
 async def cancel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat = update.effective_chat
+    msg = update.effective_message
     user = update.effective_user
-    key = session_key(chat, user.id)
-    sess = SESSIONS.get(key)
+    sess = context.chat_data.get(user.id)
     if not sess or not sess.collecting:
-        await update.effective_message.reply_text(COPY["not_capturing"])
+        await msg.reply_text(COPY["not_capturing"])
         return
-    del SESSIONS[key]
-    await update.effective_message.reply_text(COPY["cancel_ok"])
+    _drop_session(context.application, sess.chat_id, user.id)
+    await msg.reply_text(COPY["cancel_ok"])
 
 @require_auth
 async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat = update.effective_chat
     user = update.effective_user
-    key = session_key(chat, user.id)
-    sess = SESSIONS.get(key)
+    sess = context.chat_data.get(user.id)
 
     if not sess or not sess.collecting:
         return
 
     msg = update.effective_message
-    media_type = is_supported_media(msg)
+    media_type, inferred = classify(msg)
     if not media_type:
         return
 
     try:
-        inferred = infer_name_from_message(msg)
         item = Item(
             message_id=msg.message_id,
             file_name=inferred,
-            date_iso=(msg.date or datetime.now(timezone.utc)).isoformat(),
             msg_type=media_type,
         )
         sess.items.append(item)
+        _touch_session(sess)
+        sess.ack_pending += 1
 
-        template = "file_received" if inferred != "unnamed" else "file_received_noname"
-        await msg.reply_text(
-            COPY[template].format(name=inferred),
-            parse_mode=ParseMode.MARKDOWN,
-            quote=False,
-        )
+        delay = max(ACK_DEBOUNCE, sess.ack_last_flush + sess.ack_interval - time.time())
+        _schedule_flush(context.job_queue, sess, delay)
     except Exception as e:
         log.exception("Error collecting media: %s", e)
         await msg.reply_text(COPY["error_generic"])
 
+def _schedule_flush(job_queue, sess: Session, delay: float):
+    # One queued flush per session; later files are picked up by it
+    name = _ack_job_name(sess.chat_id, sess.user_id)
+    if sess.collecting and not job_queue.get_jobs_by_name(name):
+        job_queue.run_once(_flush_ack, delay, data=sess, name=name)
+
+async def _flush_ack(context: ContextTypes.DEFAULT_TYPE):
+    sess: Session = context.job.data
+    # A flush still awaiting Telegram reschedules on completion; sending
+    # now could post a second status message before ack_msg_id is known.
+    if sess.ack_in_flight:
+        return
+    if not sess.collecting or not sess.ack_pending or not sess.items:
+        return
+
+    text = COPY["capture_status"].format(
+        count=len(sess.items), name=html.escape(sess.items[-1].file_name)
+    )
+    pending, sess.ack_pending = sess.ack_pending, 0
+    sess.ack_last_flush = time.time()
+    sess.ack_in_flight = True
+    try:
+        if sess.ack_msg_id is None:
+            sent = await context.bot.send_message(
+                sess.chat_id,
+                text,
+                parse_mode=ParseMode.HTML,
+                disable_notification=True,
+            )
+            sess.ack_msg_id = sent.message_id
+        else:
+            await context.bot.edit_message_text(
+                text,
+                chat_id=sess.chat_id,
+                message_id=sess.ack_msg_id,
+                parse_mode=ParseMode.HTML,
+            )
+    except RetryAfter as e:
+        # Back off and try again once Telegram allows it
+        sess.ack_pending += pending
+        sess.ack_ok_streak = 0
+        sess.ack_interval = min(sess.ack_interval * 2, ACK_INTERVAL_MAX)
+        sess.ack_in_flight = False
+        _schedule_flush(context.job_queue, sess, max(e.retry_after, sess.ack_interval))
+        return
+    except Exception as e:
+        log.error("Failed to update capture status in %s: %s", sess.chat_id, e)
+        # Start a fresh status message next time
+        sess.ack_msg_id = None
+    else:
+        sess.ack_ok_streak += 1
+        if sess.ack_ok_streak >= ACK_RECOVER_AFTER:
+            sess.ack_ok_streak = 0
+            sess.ack_interval = max(sess.ack_interval / 2, ACK_INTERVAL)
+    finally:
+        sess.ack_in_flight = False
+
+    # Files that arrived while we were sending
+    if sess.ack_pending:
+        _schedule_flush(context.job_queue, sess, sess.ack_interval)
+
 @require_auth
 async def last_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.effective_message
     chat = update.effective_chat
     user = update.effective_user
-    key = session_key(chat, user.id)
-    sess = SESSIONS.get(key)
+    sess = context.chat_data.get(user.id)
 
     if not sess or not sess.collecting:
-        await update.effective_message.reply_text(COPY["not_capturing"])
+        await msg.reply_text(COPY["not_capturing"])
         return
 
+    # Detach the session before forwarding so media arriving concurrently
+    # cannot mutate it and a fresh /first starts clean.
+    _drop_session(context.application, chat.id, user.id)
+
     count = len(sess.items)
     if count == 0:
-        del SESSIONS[key]
-        await update.effective_message.reply_text(COPY["last_none"])
+        await msg.reply_text(COPY["last_none"])
         return
 
-    await update.effective_message.reply_text(
+    await msg.reply_text(
         COPY["last_processing"].format(count=count),
         parse_mode=ParseMode.MARKDOWN
     )
 
-    items_sorted = sorted(sess.items, key=lambda it: natural_sort_key(it.file_name))
+    # Forward in the background so other chats are not queued behind us.
+    context.application.create_task(
+        _forward_all(context, sess, chat.id), update=update
+    )
 
-    for it in items_sorted:
-        try:
-            await context.bot.copy_message(
-                chat_id=chat.id,
-                from_chat_id=chat.id,
-                message_id=it.message_id,
-            )
-            await asyncio.sleep(0.05)
-        except Exception as e:
-            log.error("Failed to copy message %s: %s", it.message_id, e)
+async def _forward_all(context: ContextTypes.DEFAULT_TYPE, sess: Session, chat_id: int):
+    # Keys are precomputed, so this is a plain C-level tuple sort. It holds
+    # the GIL throughout, so a worker thread would not free the loop anyway.
+    items_sorted = sorted(sess.items, key=attrgetter("sort_key"))
+    count = len(items_sorted)
+
+    # Copies stay sequential so files land in sorted order; pacing is left
+    # to the application's rate limiter instead of a fixed sleep.
+    ids_sorted = [it.message_id for it in items_sorted]
+    failed = 0
+    for run in _increasing_runs(ids_sorted, COPY_BATCH_MAX):
+        if len(run) > 1:
+            try:
+                copied = await _retry_after(
+                    context.bot.copy_messages,
+                    chat_id=chat_id,
+                    from_chat_id=chat_id,
+                    message_ids=run,
+                )
+                # Ids Telegram cannot copy are skipped without an error
+                failed += len(run) - len(copied)
+                continue
+            except BadRequest as e:
+                # A definite rejection, so nothing was copied
+                log.warning("Bulk copy of %d messages failed, copying one by one: %s", len(run), e)
+            except Exception as e:
+                # Timeouts and other network errors may strike after the
+                # copies went out; retrying could post them twice
+                log.error("Failed to copy messages %s..%s: %s", run[0], run[-1], e)
+                failed += len(run)
+                continue
+
+        for message_id in run:
+            try:
+                await _retry_after(
+                    context.bot.copy_message,
+                    chat_id=chat_id,
+                    from_chat_id=chat_id,
+                    message_id=message_id,
+                )
+            except Exception as e:
+                log.error("Failed to copy message %s: %s", message_id, e)
+                failed += 1
 
-    del SESSIONS[key]
-    await update.effective_message.reply_text(
-        COPY["last_done"].format(count=count),
-        parse_mode=ParseMode.MARKDOWN
-    )
+    if failed:
+        text = COPY["last_partial"].format(sent=count - failed, count=count, failed=failed)
+    else:
+        text = COPY["last_done"].format(count=count)
+    await context.bot.send_message(chat_id, text, parse_mode=ParseMode.MARKDOWN)
 
 # Optional: quickly get your Telegram user ID
 @require_auth
@@ -383,15 +609,64 @@ async def whoami(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode=ParseMode.MARKDOWN
     )
 
+# =========================
+# Background jobs
+# =========================
+async def sweep_sessions(context: ContextTypes.DEFAULT_TYPE):
+    cutoff = time.time() - SESSION_TTL
+    # The index is ordered by last touch, so stop at the first fresh one
+    stale = []
+    for key, touched in _SESSION_LRU.items():
+        if touched >= cutoff:
+            break
+        stale.append(key)
+    for chat_id, user_id in stale:
+        _drop_session(context.application, chat_id, user_id)
+    if stale:
+        log.info("Evicted %d idle session(s)", len(stale))
+
 # =========================
 # Main
 # =========================
 def main():
+    # libuv-backed event loop when available; stock asyncio otherwise.
+    # The policy is set directly because uvloop.install() is deprecated on
+    # Python 3.12+; run_polling/run_webhook take their loop from it.
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     token = os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("BOT_TOKEN env var not set")
 
-    app = Application.builder().token(token).build()
+    # HTTP connection pool (tune via env):
+    #   PTB_POOL_SIZE="64"     connections shared by replies and /last copies
+    #   PTB_POOL_TIMEOUT="30"  seconds to wait for a free connection
+    pool_size = int(os.getenv("PTB_POOL_SIZE", "64"))
+    pool_timeout = float(os.getenv("PTB_POOL_TIMEOUT", "30"))
+
+    # Sessions survive restarts here (set SESSIONS_FILE to relocate)
+    persistence = PicklePersistence(filepath=os.getenv("SESSIONS_FILE", "sessions.pkl"))
+
+    app = (
+        Application.builder()
+        .token(token)
+        .persistence(persistence)
+        .post_init(_load_session_index)
+        .concurrent_updates(True)
+        .request(HTTPXRequest(
+            connection_pool_size=pool_size,
+            pool_timeout=pool_timeout,
+            http_version="2",
+        ))
+        .get_updates_request(HTTPXRequest(connection_pool_size=8, http_version="2"))
+        .rate_limiter(AIORateLimiter(overall_max_rate=30, overall_time_period=1))
+        .build()
+    )
 
     # Commands
     app.add_handler(CommandHandler("start", start))
@@ -415,8 +690,29 @@ def main():
     )
     app.add_handler(MessageHandler(media_filter, handle_media))
 
-    log.info("Starting bot...")
-    app.run_polling(close_loop=False)
+    # Idle session sweeper
+    app.job_queue.run_repeating(sweep_sessions, interval=SWEEP_INTERVAL, first=SWEEP_INTERVAL)
+
+    # Webhook mode (set USE_WEBHOOK=1); long polling otherwise, for local dev:
+    #   PUBLIC_URL="https://bot.example.com"  externally reachable base URL
+    #   PORT="8443"                           local listen port
+    #   WEBHOOK_SECRET="..."                  optional X-Telegram-Bot-Api-Secret-Token
+    if os.getenv("USE_WEBHOOK"):
+        public_url = os.getenv("PUBLIC_URL")
+        if not public_url:
+            raise RuntimeError("PUBLIC_URL env var not set (required with USE_WEBHOOK)")
+        log.info("Starting bot (webhook)...")
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.getenv("PORT", "8443")),
+            url_path=token,
+            webhook_url=f"{public_url.rstrip('/')}/{token}",
+            secret_token=os.getenv("WEBHOOK_SECRET"),
+            close_loop=False,
+        )
+    else:
+        log.info("Starting bot...")
+        app.run_polling(close_loop=False)
 
 if __name__ == "__main__":
     main()